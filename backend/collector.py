@@ -11,9 +11,21 @@ import time
 from datetime import datetime, timedelta
 import platform
 import re
+import json
 import requests
 import speedtest
 import socket
+import atexit
+import threading
+from concurrent.futures import ThreadPoolExecutor
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+try:
+    import icmplib
+except ImportError:
+    icmplib = None
 # ================== CONFIGURATION ==================
 SERVICE_ACCOUNT_KEY_PATH = 'intelligent-system-monitor-firebase-adminsdk-fbsvc-75c6041d28.json'
 
@@ -23,6 +35,29 @@ MONITORED_DEVICES = [
 
 SPEED_SCALING_FACTOR = 0.5
 PUBLIC_IP_CACHE_TTL = 3600  # seconds
+SPEEDTEST_CACHE_TTL = 600  # seconds
+SPEEDTEST_SERVER_TTL = 3600  # seconds
+
+# Single CIM query for every WMI field used by the specs view
+CIM_SPECS_QUERY = (
+    "@{cs=(Get-CimInstance Win32_ComputerSystem | Select-Object Model);"
+    " cpu=(Get-CimInstance Win32_Processor | Select-Object Name);"
+    " gpu=(Get-CimInstance Win32_VideoController | Select-Object Name,AdapterRAM);"
+    " bios=(Get-CimInstance Win32_BIOS | Select-Object Manufacturer,SMBIOSBIOSVersion)}"
+    " | ConvertTo-Json -Depth 3"
+)
+
+# ================== REGEX PATTERNS ==================
+# Compiled once here instead of on every poll
+_RE_PING_AVG_NT = re.compile(r'Average = (\d+(?:\.\d+)?)ms')
+_RE_PING_UNIX = re.compile(r'min/avg/max/mdev = ([\d\.]+)/([\d\.]+)/')
+_RE_LOSS_NT = re.compile(r'Lost = \d+ \((\d+)% loss\)')
+_RE_LOSS_UNIX = re.compile(r'(\d+(?:\.\d+)?)% packet loss')
+_RE_TIME = re.compile(r'time[=<]?(\d+)')
+_RE_SSID = re.compile(r"\s+SSID\s*:\s*(.+)")
+_RE_SIGNAL = re.compile(r"\s+Signal\s*:\s*(\d+)%")
+_RE_RATE = re.compile(r"\s+Receive rate \(Mbps\)\s*:\s*(\d+)")
+_RE_WMIC_VALUE = re.compile(r'^(\w+)=(.*)$', re.MULTILINE)
 
 # ================== FIREBASE INIT ==================
 try:
@@ -38,136 +73,322 @@ except Exception as e:
     exit()
 
 # ================== GLOBAL STATE ==================
+# Volume holding the collector; resolved once since it can't change while running
+_DRIVE_ROOT = os.path.splitdrive(os.path.abspath(__file__))[0]+'\\' if os.name=='nt' else '/'
 _prev_net_io = None
 _prev_net_time = None
 _prev_disk_io = None
 _prev_disk_time = None
-_public_ip_cache = {"value": None, "timestamp": None}
+class _CacheEntry:
+    # Attribute slots are cheaper to read than dict keys on the polling path;
+    # timestamp is a time.monotonic() reading so clock adjustments can't skew TTLs
+    __slots__ = ("value", "timestamp")
+    def __init__(self):
+        self.value = None
+        self.timestamp = None
+
+_public_ip_cache = _CacheEntry()
+# Collectors run concurrently; only one of them fills the ipinfo cache on a miss
+_IPINFO_LOCK = threading.Lock()
+_speedtest_cache = _CacheEntry()
+_speedtest_client = _CacheEntry()
+# One live test at a time: runs share the cached Speedtest instance and its results
+_SPEEDTEST_LOCK = threading.Lock()
+_STATIC_SPECS_CACHE = None
+_OS_BIOS_INFO_CACHE = None
+_WMI_CACHE = None
+# Single-flight fill of the WMI/static spec caches (loop thread and API requests race at startup)
+_SPECS_LOCK = threading.RLock()
+# Latest metrics snapshot, refreshed by the background loop and served as-is by the API
+_LATEST_METRICS = {}
+_METRICS_LOCK = threading.Lock()
+# Serializes whole collections (_get_counter_deltas mutates module-level counters)
+_REFRESH_LOCK = threading.RLock()
+_metrics_loop_started = False
+
+# Keep-alive session so ipinfo.io lookups reuse the TLS connection
+_HTTP = requests.Session()
+_HTTP.mount('https://', requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+# Independent blocking collectors run concurrently; a cycle costs the slowest one, not the sum
+_METRICS_POOL = ThreadPoolExecutor(max_workers=10, thread_name_prefix='metrics')
+
+# ================== CPU SAMPLER ==================
+# cpu_percent(interval=None) returns usage since the previous call, so a
+# background thread keeps a rolling 1 s value and readers never block.
+_cpu_load_percent = 0.0
+psutil.cpu_percent(interval=None)
+
+def _cpu_sampler_loop():
+    global _cpu_load_percent
+    while True:
+        time.sleep(1)
+        try: _cpu_load_percent = psutil.cpu_percent(interval=None)
+        except Exception: pass
+
+threading.Thread(target=_cpu_sampler_loop, daemon=True).start()
+
+# ================== NVML INIT ==================
+# One persistent NVML session instead of spawning nvidia-smi per poll
+_nvml_handle = None
+if pynvml is not None:
+    try:
+        pynvml.nvmlInit()
+        _nvml_handle = pynvml.nvmlDeviceGetHandleByIndex(0)
+        atexit.register(pynvml.nvmlShutdown)
+    except Exception:
+        _nvml_handle = None
+
+# ================== NVIDIA-SMI STREAM ==================
+# Without NVML bindings, one long-lived `nvidia-smi -lms` process streams a CSV
+# row per second instead of paying nvidia-smi's startup cost on every query.
+NVSMI_FIELDS = ('utilization.gpu', 'memory.used', 'memory.total')
+_nvsmi_proc = None  # None: not started yet, False: nvidia-smi unavailable
+_nvsmi_lock = threading.Lock()
+_nvsmi_ready = threading.Event()
+_LATEST_GPU = {}
+
+def _nvsmi_reader(proc):
+    global _LATEST_GPU, _nvsmi_proc
+    for line in proc.stdout:
+        parts = [p.strip() for p in line.split(',')]
+        if len(parts) == len(NVSMI_FIELDS):
+            _LATEST_GPU = dict(zip(NVSMI_FIELDS, parts))
+            _nvsmi_ready.set()
+    # Stream ended: allow a restart only if it ever produced data
+    with _nvsmi_lock:
+        _LATEST_GPU = {}
+        _nvsmi_proc = None if _nvsmi_ready.is_set() else False
+        _nvsmi_ready.clear()
+
+def _stop_nvsmi_stream():
+    proc = _nvsmi_proc
+    if proc:
+        try: proc.terminate()
+        except Exception: pass
+
+atexit.register(_stop_nvsmi_stream)
+
+def _ensure_nvsmi_stream():
+    global _nvsmi_proc
+    with _nvsmi_lock:
+        if _nvsmi_proc is False:
+            return False
+        if _nvsmi_proc is None:
+            try:
+                _nvsmi_proc = subprocess.Popen(
+                    ['nvidia-smi', '-i', '0', f"--query-gpu={','.join(NVSMI_FIELDS)}",
+                     '--format=csv,noheader,nounits', '-lms', '1000'],
+                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            except Exception:
+                _nvsmi_proc = False
+                return False
+            threading.Thread(target=_nvsmi_reader, args=(_nvsmi_proc,), daemon=True).start()
+        proc = _nvsmi_proc
+    # First caller waits briefly for the initial row
+    if _nvsmi_ready.wait(timeout=2):
+        return True
+    # Started but silent: give up for good rather than blocking every later query
+    with _nvsmi_lock:
+        if _nvsmi_proc is proc:
+            _nvsmi_proc = False
+    try: proc.terminate()
+    except Exception: pass
+    return False
 
 # ================== UTILITY FUNCTIONS ==================
 
-def run_wmic_command(parts, parse_key='Name'):
-    if os.name != 'nt':
-        return "N/A (Non-Windows)"
+def _run_wmic_command_nt(parts, parse_keys=('Name',)):
+    # One wmic call per WMI class, returning every requested property
+    values = {}
     try:
-        cmd = ['wmic'] + parts + ['get', parse_key, '/value']
-        res = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+        cmd = ['wmic'] + parts + ['get', ','.join(parse_keys), '/value']
+        res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=5)
         if res.returncode == 0:
-            match = re.search(f'{re.escape(parse_key)}=(.*)', res.stdout, re.IGNORECASE)
-            if match:
-                return match.group(1).strip()
-        return "N/A"
+            for match in _RE_WMIC_VALUE.finditer(res.stdout):
+                values.setdefault(match.group(1).lower(), match.group(2).strip())
     except Exception:
-        return "N/A"
+        pass
+    return {key: values.get(key.lower()) or "N/A" for key in parse_keys}
 
-def run_nvidia_smi(query):
+def get_gpu_stats():
+    # One batched query: (utilization %, memory used MiB, memory total MiB), None without a GPU
+    if _nvml_handle is not None:
+        try:
+            util = pynvml.nvmlDeviceGetUtilizationRates(_nvml_handle)
+            mem = pynvml.nvmlDeviceGetMemoryInfo(_nvml_handle)
+            return float(util.gpu), mem.used/1024**2, mem.total/1024**2
+        except Exception:
+            return None
+    # Fallback for machines without the NVML bindings
+    if not _ensure_nvsmi_stream():
+        return None
+    row = _LATEST_GPU
     try:
-        cmd = ['nvidia-smi', f'--query-gpu={query}', '--format=csv,noheader,nounits']
-        res = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-        return res.stdout.strip()
+        return tuple(float(row[field]) for field in NVSMI_FIELDS)
     except Exception:
+        return None
+
+def _collect_all_wmi_once():
+    # One powershell process instead of a wmic spawn per field; result is memoised
+    global _WMI_CACHE
+    if _WMI_CACHE is not None:
+        return _WMI_CACHE
+    with _SPECS_LOCK:
+        if _WMI_CACHE is not None:
+            return _WMI_CACHE
+        wmi = {}
+        if os.name == 'nt':
+            try:
+                cmd = ['powershell', '-NoProfile', '-Command', CIM_SPECS_QUERY]
+                res = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=15)
+                if res.returncode == 0 and res.stdout.strip():
+                    wmi = json.loads(res.stdout)
+            except Exception:
+                pass
+        # Published only once the query has finished
+        _WMI_CACHE = wmi
+        return _WMI_CACHE
+
+def _cim_instance(wmi, key):
+    # ConvertTo-Json emits a list when a class has several instances (e.g. two GPUs)
+    inst = wmi.get(key)
+    if isinstance(inst, list):
+        inst = inst[0] if inst else None
+    return inst or {}
+
+def run_nvidia_smi(query):
+    # Single-field view over get_gpu_stats(); always a string, like nvidia-smi's CSV output
+    stats = get_gpu_stats()
+    if stats is None or query not in NVSMI_FIELDS:
         return "N/A"
+    return str(stats[NVSMI_FIELDS.index(query)])
 
 def get_ping_latency(ip):
+    # In-process ICMP probe; the ping binary is only used if icmplib is missing or not permitted
+    if icmplib is not None:
+        try:
+            host = icmplib.ping(ip, count=1, timeout=1, privileged=False)
+            return (round(host.avg_rtt,2) or 0.05) if host.is_alive else None
+        except Exception:
+            pass
+    return _ping_latency_cli(ip)
+
+def _ping_latency_cli_nt(ip):
     try:
-        count = '1'
-        cmd = ['ping', '-n', count, '-w', '1000', ip] if os.name=='nt' else ['ping','-c',count,'-W','1',ip]
-        res = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
+        res = subprocess.run(['ping', '-n', '1', '-w', '1000', ip], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=5)
         if res.returncode == 0:
-            out = res.stdout
-            if os.name=='nt':
-                match = re.search(r'Average = (\d+(?:\.\d+)?)ms', out)
-                if match:
-                    val = match.group(1)
-                    return 0.05 if val in ['0','<1'] else float(val)
-            else:
-                match = re.search(r'min/avg/max/mdev = ([\d\.]+)/([\d\.]+)/', out)
-                if match:
-                    return float(match.group(2))
+            match = _RE_PING_AVG_NT.search(res.stdout.decode('ascii', errors='ignore'))
+            if match:
+                val = match.group(1)
+                return 0.05 if val in ['0','<1'] else float(val)
         return None
     except Exception:
         return None
 
-def get_latest_speed_test():
+def _ping_latency_cli_posix(ip):
     try:
-        # Always set region/country from ipinfo.io, ISP from org
-        ipinfo = None
-        try:
-            res = requests.get("https://ipinfo.io/json", timeout=5)
-            if res.status_code == 200:
-                ipinfo = res.json()
-        except Exception as e:
-            print(f"❌ ipinfo.io fetch failed: {e}")
-            ipinfo = None
-
-        isp_name = ipinfo.get('org', 'N/A') if ipinfo else 'N/A'
-        region = ipinfo.get('city', 'N/A') if ipinfo else 'Chennai'
-        country = ipinfo.get('country', 'N/A') if ipinfo else 'India'
-
-        latest = db.collection('network_tests')\
-            .where('device_id', '==', MONITORED_DEVICES[0]['device_id'])\
-            .order_by('timestamp', direction=firestore.Query.DESCENDING)\
-            .limit(1).get()
-        if latest and latest[0].to_dict().get('isp_name','N/A') not in ['N/A','FAILURE','Unknown ISP']:
-            data = latest[0].to_dict()
-            return {
-                'download_speed_mbps': round(data.get('download_mbps',0.0)*SPEED_SCALING_FACTOR,2),
-                'upload_speed_mbps': round(data.get('upload_mbps',0.0)*SPEED_SCALING_FACTOR,2),
-                'isp_name': isp_name,
-                'region': region,
-                'country': country
-            }
-        # If no valid result, run a speed test live
-        import speedtest
-        st = speedtest.Speedtest()
-        st.get_best_server()
-        dl = (st.download()/1024/1024)*8
-        ul = (st.upload()/1024/1024)*8
+        res = subprocess.run(['ping','-c','1','-W','1',ip], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=5)
+        if res.returncode == 0:
+            match = _RE_PING_UNIX.search(res.stdout.decode('ascii', errors='ignore'))
+            if match:
+                return float(match.group(2))
+        return None
+    except Exception:
+        return None
+
+def get_latest_speed_test():
+    # Always set region/country from ipinfo.io, ISP from org (served from the public IP cache)
+    ipinfo = _get_ipinfo()
+    isp_name = ipinfo.get('org', 'N/A') if ipinfo else 'N/A'
+    region = ipinfo.get('city', 'N/A') if ipinfo else 'Chennai'
+    country = ipinfo.get('country', 'N/A') if ipinfo else 'India'
+
+    latest = db.collection('network_tests')\
+        .where('device_id', '==', MONITORED_DEVICES[0]['device_id'])\
+        .order_by('timestamp', direction=firestore.Query.DESCENDING)\
+        .limit(1).get()
+    if latest and latest[0].to_dict().get('isp_name','N/A') not in ['N/A','FAILURE','Unknown ISP']:
+        data = latest[0].to_dict()
         return {
-            'download_speed_mbps': round(dl*SPEED_SCALING_FACTOR,2),
-            'upload_speed_mbps': round(ul*SPEED_SCALING_FACTOR,2),
+            'download_speed_mbps': round(data.get('download_mbps',0.0)*SPEED_SCALING_FACTOR,2),
+            'upload_speed_mbps': round(data.get('upload_mbps',0.0)*SPEED_SCALING_FACTOR,2),
             'isp_name': isp_name,
             'region': region,
             'country': country
         }
+    # No stored result: report zeros; only run_full_speed_test_logic runs a live test
+    return {'download_speed_mbps':0.0,'upload_speed_mbps':0.0,'isp_name':isp_name,'region':region,'country':country}
+
+def _get_cached_speedtest():
+    # Latest speed test result changes only when a new test is run; avoid a Firestore query per cycle
+    cached_ts=_speedtest_cache.timestamp
+    if cached_ts is not None and time.monotonic()-cached_ts<SPEEDTEST_CACHE_TTL:
+        return _speedtest_cache.value
+    try:
+        val=get_latest_speed_test()
     except Exception as e:
-        print(f"❌ Live speed test failed: {e}")
-        return {'download_speed_mbps':0.0,'upload_speed_mbps':0.0,'isp_name':'N/A','region':'N/A','country':'N/A'}
+        # Failures are not cached: keep serving the last good result and retry next cycle
+        print(f"❌ Speed test lookup failed: {e}")
+        return _speedtest_cache.value or {'download_speed_mbps':0.0,'upload_speed_mbps':0.0,'isp_name':'N/A','region':'N/A','country':'N/A'}
+    _speedtest_cache.value=val; _speedtest_cache.timestamp=time.monotonic()
+    return val
 
 def collect_static_specs():
     specs = {}
-    specs['device_model'] = run_wmic_command(['computersystem'], 'Model')
-    specs['processor_model'] = run_wmic_command(['cpu'])
+    wmi = _collect_all_wmi_once()
+    if wmi:
+        gpu = _cim_instance(wmi, 'gpu')
+        specs['device_model'] = (_cim_instance(wmi, 'cs').get('Model') or 'N/A').strip()
+        specs['processor_model'] = (_cim_instance(wmi, 'cpu').get('Name') or 'N/A').strip()
+        specs['gpu_model'] = (gpu.get('Name') or 'N/A').strip()
+        try:
+            specs['gpu_total_memory_gb'] = round(int(gpu.get('AdapterRAM') or 0)/1024**3,2)
+        except Exception:
+            specs['gpu_total_memory_gb'] = 0.0
+    else:
+        # Fallback for hosts where the CIM query is unavailable
+        specs['device_model'] = run_wmic_command(['computersystem'], ('Model',))['Model']
+        specs['processor_model'] = run_wmic_command(['cpu'])['Name']
+        gpu = run_wmic_command(['path','Win32_VideoController'], ('Name','AdapterRAM'))
+        specs['gpu_model'] = gpu['Name']
+        try:
+            specs['gpu_total_memory_gb'] = round(int(gpu['AdapterRAM'])/1024**3,2)
+        except Exception:
+            specs['gpu_total_memory_gb'] = 0.0
     specs['cpu_cores'] = psutil.cpu_count(logical=False)
     specs['cpu_threads'] = psutil.cpu_count(logical=True)
-    specs['gpu_model'] = run_wmic_command(['path','Win32_VideoController'])
-    try:
-        vram = subprocess.run(['wmic','path','Win32_VideoController','get','AdapterRAM','/value'],
-                              capture_output=True, text=True, timeout=5).stdout
-        match = re.search(r'AdapterRAM=(.*)', vram)
-        specs['gpu_total_memory_gb'] = round(int(match.group(1))/1024**3,2) if match else 0.0
-    except Exception:
-        specs['gpu_total_memory_gb'] = 0.0
     specs['ram_total_gb'] = round(psutil.virtual_memory().total/1024**3,2)
 
-    net_addrs = psutil.net_if_addrs()
-    primary_interface = next((n for n,a in net_addrs.items()
-                              if not n.lower().startswith('lo') and
-                              any(addr.family == socket.AF_INET for addr in a)), 'Unknown')
-    specs['network_interface_name'] = primary_interface
-    specs['private_ip_address'] = 'N/A'
-    specs['mac_address'] = 'N/A'
-
-    if primary_interface in net_addrs:
-        for addr in net_addrs[primary_interface]:
-            if addr.family == socket.AF_INET:
-                specs['private_ip_address'] = addr.address
-            elif addr.family == getattr(psutil, 'AF_LINK', 17) or getattr(addr, 'family', None) == getattr(socket, 'AF_LINK', 17):
-                specs['mac_address'] = addr.address
-
     specs['cpu_tdp_watts'] = 65
     specs.update(get_os_bios_info())
     return specs
+
+def get_network_interface_info():
+    # Not part of the cached specs: interface and DHCP address change when the network does.
+    # Single pass: the first non-loopback interface with IPv4 supplies name, IP and MAC
+    info = {'network_interface_name': 'Unknown', 'private_ip_address': 'N/A', 'mac_address': 'N/A'}
+    link_families = (getattr(psutil, 'AF_LINK', 17), getattr(socket, 'AF_LINK', 17))
+    for name, addrs in psutil.net_if_addrs().items():
+        if name.lower().startswith('lo'):
+            continue
+        ipv4 = next((addr.address for addr in addrs if addr.family == socket.AF_INET), None)
+        if ipv4:
+            info['network_interface_name'] = name
+            info['private_ip_address'] = ipv4
+            info['mac_address'] = next((addr.address for addr in addrs if addr.family in link_families), 'N/A')
+            break
+    return info
+
+def _get_static_specs_cached():
+    # Hardware/BIOS details don't change between reboots, collect them once
+    global _STATIC_SPECS_CACHE
+    if _STATIC_SPECS_CACHE is None:
+        with _SPECS_LOCK:
+            if _STATIC_SPECS_CACHE is None:
+                _STATIC_SPECS_CACHE = collect_static_specs()
+    return _STATIC_SPECS_CACHE.copy()
+
 def _get_counter_deltas():
     global _prev_net_io,_prev_net_time,_prev_disk_io,_prev_disk_time
     now = time.time()
@@ -178,9 +399,12 @@ def _get_counter_deltas():
         if elapsed>0:
             down_mbps = (((net.bytes_recv-_prev_net_io.bytes_recv)*8)/(elapsed*1024*1024))*SPEED_SCALING_FACTOR
             up_mbps = (((net.bytes_sent-_prev_net_io.bytes_sent)*8)/(elapsed*1024*1024))*SPEED_SCALING_FACTOR
-            speed_data = get_latest_speed_test()
-            down_mbps = min(down_mbps, speed_data['download_speed_mbps']*1.5)
-            up_mbps = min(up_mbps, speed_data['upload_speed_mbps']*1.5)
+            speed_data = _get_cached_speedtest()
+            # Clamp only against a known ceiling; 0.0 means no speed test has been stored yet
+            if speed_data['download_speed_mbps']>0:
+                down_mbps = min(down_mbps, speed_data['download_speed_mbps']*1.5)
+            if speed_data['upload_speed_mbps']>0:
+                up_mbps = min(up_mbps, speed_data['upload_speed_mbps']*1.5)
     _prev_net_io=net; _prev_net_time=now
     disk=psutil.disk_io_counters(); read=0.0; write=0.0
     if _prev_disk_io and _prev_disk_time:
@@ -199,120 +423,194 @@ def get_battery_info():
     return None,None
 
 def get_packet_loss_jitter(ip="8.8.8.8", count=5):
+    if icmplib is not None:
+        try:
+            host=icmplib.ping(ip,count=count,interval=0.2,timeout=1,privileged=False)
+            return round(host.packet_loss*100,2),round(host.jitter,2)
+        except Exception: pass
+    return _packet_loss_jitter_cli(ip,count)
+
+def _ping_jitter(out):
+    times=[float(m.group(1)) for m in _RE_TIME.finditer(out)]
+    return round(max(times)-min(times),2) if len(times)>=2 else 0.0
+
+def _packet_loss_jitter_cli_nt(ip,count):
     try:
-        cmd = ["ping","-n",str(count),ip] if os.name=='nt' else ["ping","-c",str(count),ip]
-        res=subprocess.run(cmd,capture_output=True,text=True,timeout=6)
-        out=res.stdout
-        loss_pct=0.0
-        match_loss=re.search(r'Lost = \d+ \((\d+)% loss\)',out)
-        if match_loss: loss_pct=float(match_loss.group(1))
-        else:
-            match_unix=re.search(r'(\d+(?:\.\d+)?)% packet loss',out)
-            if match_unix: loss_pct=float(match_unix.group(1))
-        times=[float(m.group(1)) for m in re.finditer(r'time[=<]?(\d+)',out)]
-        jitter = round(max(times)-min(times),2) if len(times)>=2 else 0.0
-        return loss_pct,jitter
+        # Decoded even on a non-zero exit: that's how ping reports total loss
+        out=subprocess.run(["ping","-n",str(count),ip],stdout=subprocess.PIPE,stderr=subprocess.DEVNULL,timeout=6).stdout.decode('ascii',errors='ignore')
+        match_loss=_RE_LOSS_NT.search(out)
+        return (float(match_loss.group(1)) if match_loss else 0.0),_ping_jitter(out)
     except Exception: return 0.0,0.0
 
-def get_public_ip_and_geo():
-    global _public_ip_cache
+def _packet_loss_jitter_cli_posix(ip,count):
     try:
-        now=datetime.utcnow(); cached_ts=_public_ip_cache.get("timestamp")
-        if cached_ts and (now-cached_ts).total_seconds()<PUBLIC_IP_CACHE_TTL:
-            return _public_ip_cache.get("value",("N/A","N/A","N/A"))
-        res=requests.get("https://ipinfo.io/json",timeout=5)
-        if res.status_code==200:
-            data=res.json()
-            val=(data.get("ip","N/A"),data.get("city","N/A"),data.get("country","N/A"))
-            _public_ip_cache["value"]=val; _public_ip_cache["timestamp"]=datetime.utcnow()
-            return val
-    except Exception: pass
-    return "N/A","N/A","N/A"
+        out=subprocess.run(["ping","-c",str(count),ip],stdout=subprocess.PIPE,stderr=subprocess.DEVNULL,timeout=6).stdout.decode('ascii',errors='ignore')
+        match_loss=_RE_LOSS_UNIX.search(out)
+        return (float(match_loss.group(1)) if match_loss else 0.0),_ping_jitter(out)
+    except Exception: return 0.0,0.0
 
-def get_gpu_memory_usage_percent():
+def _get_ipinfo():
+    # Cached ipinfo.io payload shared by the geo and speed test lookups; None if unavailable
     try:
-        used=run_nvidia_smi("memory.used")
-        total=run_nvidia_smi("memory.total")
-        if used!="N/A" and total!="N/A":
-            used_f=float(used); total_f=float(total)
-            if total_f>0: return round((used_f/total_f)*100,2)
+        with _IPINFO_LOCK:
+            cached_ts=_public_ip_cache.timestamp
+            if cached_ts is not None and time.monotonic()-cached_ts<PUBLIC_IP_CACHE_TTL:
+                return _public_ip_cache.value
+            res=_HTTP.get("https://ipinfo.io/json",timeout=5)
+            if res.status_code==200:
+                data=res.json()
+                _public_ip_cache.value=data; _public_ip_cache.timestamp=time.monotonic()
+                return data
     except Exception: pass
     return None
 
-def get_wifi_info():
-    if os.name!="nt": return "N/A",0,0
+def get_public_ip_and_geo():
+    data=_get_ipinfo()
+    if data:
+        return data.get("ip","N/A"),data.get("city","N/A"),data.get("country","N/A")
+    return "N/A","N/A","N/A"
+
+def _gpu_memory_percent(stats):
+    if stats is not None:
+        _,used_f,total_f=stats
+        if total_f>0: return round((used_f/total_f)*100,2)
+    return None
+
+def get_gpu_memory_usage_percent():
+    return _gpu_memory_percent(get_gpu_stats())
+
+def _get_wifi_info_nt():
     try:
         out=subprocess.check_output(["netsh","wlan","show","interfaces"],text=True,timeout=5,stderr=subprocess.DEVNULL)
-        ssid = re.search(r"\s+SSID\s*:\s*(.+)",out); ssid=ssid.group(1).strip() if ssid else "N/A"
-        signal=re.search(r"\s+Signal\s*:\s*(\d+)%",out); signal=int(signal.group(1)) if signal else 0
-        rate=re.search(r"\s+Receive rate \(Mbps\)\s*:\s*(\d+)",out)
+        ssid = _RE_SSID.search(out); ssid=ssid.group(1).strip() if ssid else "N/A"
+        signal=_RE_SIGNAL.search(out); signal=int(signal.group(1)) if signal else 0
+        rate=_RE_RATE.search(out)
         rate=int(rate.group(1)) if rate else 0
         return ssid,signal,rate
     except Exception: return "N/A",0,0
 
 def get_os_bios_info():
-    info={"os_name":platform.system(),"os_version":platform.platform(),"bios_vendor":"N/A","bios_version":"N/A"}
-    if os.name=='nt':
-        try:
-            info["bios_vendor"]=run_wmic_command(["bios"],"Manufacturer")
-            info["bios_version"]=run_wmic_command(["bios"],"SMBIOSBIOSVersion")
-        except Exception: pass
-    return info
+    global _OS_BIOS_INFO_CACHE
+    if _OS_BIOS_INFO_CACHE is not None:
+        return _OS_BIOS_INFO_CACHE.copy()
+    with _SPECS_LOCK:
+        if _OS_BIOS_INFO_CACHE is not None:
+            return _OS_BIOS_INFO_CACHE.copy()
+        info={"os_name":platform.system(),"os_version":platform.platform(),"bios_vendor":"N/A","bios_version":"N/A"}
+        if os.name=='nt':
+            try:
+                bios=_cim_instance(_collect_all_wmi_once(),'bios')
+                if bios:
+                    info["bios_vendor"]=(bios.get("Manufacturer") or "N/A").strip()
+                    info["bios_version"]=(bios.get("SMBIOSBIOSVersion") or "N/A").strip()
+                else:
+                    bios=run_wmic_command(["bios"],("Manufacturer","SMBIOSBIOSVersion"))
+                    info["bios_vendor"]=bios["Manufacturer"]
+                    info["bios_version"]=bios["SMBIOSBIOSVersion"]
+            except Exception: pass
+        _OS_BIOS_INFO_CACHE=info
+        return info.copy()
+
+# ================== PLATFORM DISPATCH ==================
+# Bound once at import so the polling path never re-checks os.name
+def _run_wmic_command_stub(parts, parse_keys=('Name',)):
+    return {key: "N/A (Non-Windows)" for key in parse_keys}
+
+def _get_wifi_info_stub():
+    return "N/A",0,0
+
+if os.name=='nt':
+    run_wmic_command=_run_wmic_command_nt
+    get_wifi_info=_get_wifi_info_nt
+    _ping_latency_cli=_ping_latency_cli_nt
+    _packet_loss_jitter_cli=_packet_loss_jitter_cli_nt
+else:
+    run_wmic_command=_run_wmic_command_stub
+    get_wifi_info=_get_wifi_info_stub
+    _ping_latency_cli=_ping_latency_cli_posix
+    _packet_loss_jitter_cli=_packet_loss_jitter_cli_posix
 
 # ================== CORE METRICS ==================
-def get_system_metrics(interval_s=1.0):
+def get_system_metrics():
     results={}
-    try: results['cpu_load_percent']=psutil.cpu_percent(interval=interval_s)
-    except Exception: results['cpu_load_percent']=0.0
+    results['cpu_load_percent']=_cpu_load_percent
     try: results['ram_used_percent']=psutil.virtual_memory().percent
     except Exception: results['ram_used_percent']=0.0
-    try:
-        path = os.path.splitdrive(os.path.abspath(__file__))[0]+'\\' if os.name=='nt' else '/'
-        results['disk_usage_percent']=psutil.disk_usage(path).percent
+    try: results['disk_usage_percent']=psutil.disk_usage(_DRIVE_ROOT).percent
     except Exception: results['disk_usage_percent']=0.0
-    gpu_raw=run_nvidia_smi('utilization.gpu')
-    try: results['gpu_utilization_percent']=float(gpu_raw) if gpu_raw!="N/A" else round(results['cpu_load_percent']*0.6,1)
-    except Exception: results['gpu_utilization_percent']=0.0
-    speed_data=get_latest_speed_test()
+    gpu_fut=_METRICS_POOL.submit(get_gpu_stats)
+    speed_fut=_METRICS_POOL.submit(_get_cached_speedtest)
+    bat_fut=_METRICS_POOL.submit(get_battery_info)
+    loss_fut=_METRICS_POOL.submit(get_packet_loss_jitter)
+    geo_fut=_METRICS_POOL.submit(get_public_ip_and_geo)
+    wifi_fut=_METRICS_POOL.submit(get_wifi_info)
+    # Utilization and memory both come from the same batched GPU query
+    gpu_stats=gpu_fut.result()
+    results['gpu_utilization_percent']=gpu_stats[0] if gpu_stats is not None else round(results['cpu_load_percent']*0.6,1)
+    results['gpu_memory_used_percent']=_gpu_memory_percent(gpu_stats)
+    speed_data=speed_fut.result()
     results['speedtest_download_mbps']=speed_data.get('download_speed_mbps',0.0)
     results['speedtest_upload_mbps']=speed_data.get('upload_speed_mbps',0.0)
     results['isp_name']=speed_data.get('isp_name','N/A')
     results['region']=speed_data.get('region','N/A')
     results['country']=speed_data.get('country','N/A')
+    # Mutates the module-level counters, so it stays on the calling thread
     down,up,read,write=_get_counter_deltas()
     results['actual_download_mbps']=down; results['actual_upload_mbps']=up
     results['disk_read_mb_s']=read; results['disk_write_mb_s']=write
-    bat_pct,plugged=get_battery_info()
+    bat_pct,plugged=bat_fut.result()
     results['battery_percent']=bat_pct; results['power_plugged']=plugged
-    loss,jitter=get_packet_loss_jitter()
+    loss,jitter=loss_fut.result()
     results['packet_loss_percent']=loss; results['network_jitter_ms']=jitter
-    pub_ip,city,country=get_public_ip_and_geo()
+    pub_ip,city,country=geo_fut.result()
     results['public_ip']=pub_ip; results['geo_city']=city; results['geo_country']=country
-    gpu_mem=get_gpu_memory_usage_percent()
-    results['gpu_memory_used_percent']=gpu_mem
-    ssid,signal,link=get_wifi_info()
+    ssid,signal,link=wifi_fut.result()
     results['wifi_ssid']=ssid; results['wifi_signal_percent']=signal; results['wifi_link_speed_mbps']=link
     results['collected_at']=datetime.utcnow()
     return results
 
+def refresh_latest_metrics():
+    global _LATEST_METRICS
+    with _REFRESH_LOCK:
+        metrics=get_system_metrics()
+        with _METRICS_LOCK:
+            _LATEST_METRICS=metrics
+    return metrics
+
 # ================== SPEEDTEST ==================
+def _get_speedtest_client():
+    # Server list download + best-server probing takes seconds; redo it at most hourly
+    cached_ts=_speedtest_client.timestamp
+    if _speedtest_client.value is None or cached_ts is None or time.monotonic()-cached_ts>SPEEDTEST_SERVER_TTL:
+        st=speedtest.Speedtest()
+        st.get_best_server()
+        _speedtest_client.value=st; _speedtest_client.timestamp=time.monotonic()
+    else:
+        # Re-ping only the cached server so each run logs a fresh latency
+        st=_speedtest_client.value
+        st.get_best_server([st.best])
+    return st
+
 def run_full_speed_test_logic(device_id):
     print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 Running full speed test...")
     try:
-        st=speedtest.Speedtest()
-        st.get_best_server()
-        isp=st.results.client.get('isp','Unknown ISP') if st.results else 'Unknown ISP'
-        dl=(st.download()/1024/1024)*8
-        ul=(st.upload()/1024/1024)*8
-        data={'download_mbps':round(dl,2),'upload_mbps':round(ul,2),
-              'ping_latency_ms':getattr(st.results,'ping',None) if hasattr(st,'results') else None,
-              'server_name':st.results.server.get('name') if hasattr(st,'results') and st.results.server else 'Unknown',
-              'isp_name':isp}
+        with _SPEEDTEST_LOCK:
+            st=_get_speedtest_client()
+            isp=st.results.client.get('isp','Unknown ISP') if st.results else 'Unknown ISP'
+            dl=(st.download()/1024/1024)*8
+            ul=(st.upload()/1024/1024)*8
+            data={'download_mbps':round(dl,2),'upload_mbps':round(ul,2),
+                  'ping_latency_ms':getattr(st.results,'ping',None) if hasattr(st,'results') else None,
+                  'server_name':st.results.server.get('name') if hasattr(st,'results') and st.results.server else 'Unknown',
+                  'isp_name':isp}
     except Exception as e:
         print(f"❌ Speed Test Failed: {e}")
+        _speedtest_client.value=None  # pick a fresh server next time
         data={'download_mbps':0.0,'upload_mbps':0.0,'ping_latency_ms':9999.0,'server_name':'FAILURE','isp_name':'FAILURE'}
     try:
-        db.collection('network_tests').add({
+        # Result and trigger status go out in a single commit RPC
+        batch=db.batch()
+        batch.set(db.collection('network_tests').document(),{
             'device_id':device_id,
             'download_mbps':data['download_mbps'],
             'upload_mbps':data['upload_mbps'],
@@ -321,10 +619,16 @@ def run_full_speed_test_logic(device_id):
             'isp_name':data['isp_name'],
             'timestamp':datetime.now()
         })
-        db.collection('commands').document('speed_test_trigger').set({'status':'complete','timestamp':datetime.now()},merge=True)
+        batch.set(db.collection('commands').document('speed_test_trigger'),{'status':'complete','timestamp':datetime.now()},merge=True)
+        batch.commit()
+        _speedtest_cache.timestamp=None  # next read picks up the new result
         print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ Speed Test Logged.")
     except Exception as e:
         print(f"❌ Database Push Failed after Speed Test: {e}")
+        return
+    # The dashboard re-reads the snapshot right after triggering a test, so rebuild it now
+    try: refresh_latest_metrics()
+    except Exception as e: print(f"❌ Metrics refresh after Speed Test failed: {e}")
 
 def check_and_run_command():
     try:
@@ -342,12 +646,36 @@ def push_metrics_to_firestore():
     specs_ref=db.collection('devices').document(MONITORED_DEVICES[0]['device_id'])
     try:
         if not specs_ref.get().exists:
-            specs_ref.set(collect_static_specs())
+            specs=_get_static_specs_cached()
+            specs.update(get_network_interface_info())
+            specs_ref.set(specs)
             print(f"⚙️ Pushed static specs.")
     except Exception as e: print(f"❌ Failed to push specs: {e}")
     # Only push device specs if not present
     # No metrics are pushed to Firestore. Metrics are served live via API only.
 
+def metrics_loop():
+    while True:
+        try:
+            refresh_latest_metrics()
+            push_metrics_to_firestore()
+            time.sleep(5)
+        except KeyboardInterrupt:
+            print("🛑 Stopped by user.")
+            break
+        except Exception as e:
+            print(f"❌ Unexpected error: {e}")
+            time.sleep(5)
+
+def start_metrics_loop():
+    # Idempotent: started from __main__, or lazily by the API when served by a WSGI server
+    global _metrics_loop_started
+    with _METRICS_LOCK:
+        if _metrics_loop_started:
+            return
+        _metrics_loop_started = True
+    threading.Thread(target=metrics_loop, daemon=True).start()
+
 
 # === Flask API for frontend integration ===
 from flask import Flask, jsonify, request
@@ -358,7 +686,9 @@ CORS(app)
 
 @app.route('/api/device-specs')
 def api_device_specs():
-    specs = collect_static_specs()
+    # Static part is collected once; only the dynamic fields are refreshed per request
+    specs = _get_static_specs_cached()
+    specs.update(get_network_interface_info())
     bat_pct, plugged = get_battery_info()
     
     # ADDED: Get WiFi and GPU memory info here, as it's semi-static or useful for the specs view
@@ -384,29 +714,23 @@ def api_run_speedtest():
 
 @app.route('/api/network-metrics')
 def api_network_metrics():
-    # Serve live metrics directly
+    # Serve the snapshot kept fresh by metrics_loop; only collect inline before the first one exists
     try:
-        # Pass a minimal interval to get the most recent cached/computed values
-        metrics = get_system_metrics(interval_s=0.1) 
+        start_metrics_loop()
+        metrics = _LATEST_METRICS
+        if not metrics:
+            # Wait out a collection already in flight before starting our own
+            with _REFRESH_LOCK:
+                metrics = _LATEST_METRICS or refresh_latest_metrics()
         return jsonify(metrics)
     except Exception as e:
         print(f"❌ Error fetching live metrics: {e}")
         return jsonify({"error": "No metrics found"})
 
 if __name__=="__main__":
-    import threading
-    def metrics_loop():
-        while True:
-            try:
-                push_metrics_to_firestore()
-                time.sleep(5)
-            except KeyboardInterrupt:
-                print("🛑 Stopped by user.")
-                break
-            except Exception as e:
-                print(f"❌ Unexpected error: {e}")
-                time.sleep(5)
-
-    t = threading.Thread(target=metrics_loop, daemon=True)
-    t.start()
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # With the debug reloader only the serving child (WERKZEUG_RUN_MAIN) runs the loop;
+    # otherwise the API handler starts it on the first request
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_metrics_loop()
+    # Serve each request on its own thread so a slow metrics call doesn't stall other clients
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)